@@ -3,7 +3,13 @@ import datetime
 import tempfile
 import unittest
 
-from zambretti_py.zambretti import PressureData, Trend, WindDirection, Zambretti
+from zambretti_py.zambretti import (
+    PressureData,
+    Trend,
+    WindDirection,
+    Zambretti,
+    _parse_iso8601_z,
+)
 
 
 class TestLoadingGenericCSVFile(unittest.TestCase):
@@ -60,6 +66,51 @@ class TestLoadingGenericCSVFile(unittest.TestCase):
 
             self.assertEqual(pressure_data, expected_pd)
 
+    def test_loading_csv_skips_readings_older_than_since(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            with open(tmpdirname + "history.csv", "w", newline="") as csvfile:
+                history = csv.writer(csvfile, delimiter=",")
+                history.writerow(["state", "last_changed"])
+                history.writerow(["988.6", "2024-11-19T11:33:32.706Z"])
+                history.writerow(["988.5", "2024-11-19T11:34:06.863Z"])
+                history.writerow(["988.4", "2024-11-19T11:37:06.887Z"])
+
+            pressure_data = PressureData.from_csv_file(
+                fname=tmpdirname + "history.csv",
+                timestamp_column_position=1,
+                pressure_column_position=0,
+                skip_header_rows=1,
+                strptime_template="%Y-%m-%dT%H:%M:%S.%fZ",
+                since=datetime.datetime(2024, 11, 19, 11, 34, 6, 863000),
+            )
+
+            expected_pd = PressureData(
+                points=[
+                    (datetime.datetime(2024, 11, 19, 11, 34, 6, 863000), 988.5),
+                    (datetime.datetime(2024, 11, 19, 11, 37, 6, 887000), 988.4),
+                ]
+            )
+
+            self.assertEqual(pressure_data, expected_pd)
+
+
+class TestParsingISO8601Timestamps(unittest.TestCase):
+    def test_parsing_matches_strptime(self):
+        for value in [
+            "2024-11-19T11:33:32.706Z",
+            "2024-11-19T11:33:32.706123Z",
+            "2024-11-19T11:33:32.7Z",
+        ]:
+            self.assertEqual(
+                _parse_iso8601_z(value),
+                datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ"),
+            )
+
+    def test_parsing_invalid_timestamp_raises(self):
+        for value in ["2024-11-19 11:33:32.706Z", "2024-13-19T11:33:32.706Z"]:
+            with self.assertRaises(ValueError):
+                _parse_iso8601_z(value)
+
 
 class TestLoadingCSVFromHomeAssistant(unittest.TestCase):
     def test_loading_csv_happy_path(self):
@@ -90,6 +141,86 @@ class TestLoadingCSVFromHomeAssistant(unittest.TestCase):
             )
 
             self.assertEqual(pressure_data, expected_pd)
+            self.assertTrue(pressure_data._is_sorted)
+
+    def test_loading_csv_ignores_empty_readings(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            with open(tmpdirname + "history.csv", "w", newline="") as csvfile:
+                history = csv.writer(csvfile, delimiter=",")
+                history.writerow(["entity_id", "state", "last_changed"])
+                history.writerow(
+                    ["sensor.pressure_2", "unavailable", "2024-11-19T11:33:32.706Z"]
+                )
+                history.writerow(
+                    ["sensor.pressure_2", "988.5", "2024-11-19T11:34:06.863Z"]
+                )
+                history.writerow(["sensor.pressure_2", "", "2024-11-19T11:37:06.887Z"])
+
+            pressure_data = PressureData.from_home_assistant_csv(
+                tmpdirname + "history.csv"
+            )
+
+            expected_pd = PressureData(
+                points=[
+                    (datetime.datetime(2024, 11, 19, 11, 34, 6, 863000), 988.5),
+                ]
+            )
+
+            self.assertEqual(pressure_data, expected_pd)
+
+    def test_loading_csv_skips_readings_older_than_since(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            with open(tmpdirname + "history.csv", "w", newline="") as csvfile:
+                history = csv.writer(csvfile, delimiter=",")
+                history.writerow(["entity_id", "state", "last_changed"])
+                history.writerow(
+                    ["sensor.pressure_2", "988.6", "2024-11-19T11:33:32.706Z"]
+                )
+                history.writerow(
+                    ["sensor.pressure_2", "988.5", "2024-11-19T11:34:06.863Z"]
+                )
+                history.writerow(
+                    ["sensor.pressure_2", "988.4", "2024-11-19T11:37:06.887Z"]
+                )
+
+            pressure_data = PressureData.from_home_assistant_csv(
+                tmpdirname + "history.csv",
+                since=datetime.datetime(2024, 11, 19, 11, 34, 6, 863000),
+            )
+
+            expected_pd = PressureData(
+                points=[
+                    (datetime.datetime(2024, 11, 19, 11, 34, 6, 863000), 988.5),
+                    (datetime.datetime(2024, 11, 19, 11, 37, 6, 887000), 988.4),
+                ]
+            )
+
+            self.assertEqual(pressure_data, expected_pd)
+
+    def test_loading_csv_with_quoted_values(self):
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            with open(tmpdirname + "history.csv", "w", newline="") as csvfile:
+                history = csv.writer(csvfile, delimiter=",", quoting=csv.QUOTE_ALL)
+                history.writerow(["entity_id", "state", "last_changed"])
+                history.writerow(
+                    ["sensor.pressure_2", "988.6", "2024-11-19T11:33:32.706Z"]
+                )
+                history.writerow(
+                    ["sensor.pressure_2", "988.5", "2024-11-19T11:34:06.863Z"]
+                )
+
+            pressure_data = PressureData.from_home_assistant_csv(
+                tmpdirname + "history.csv"
+            )
+
+            expected_pd = PressureData(
+                points=[
+                    (datetime.datetime(2024, 11, 19, 11, 33, 32, 706000), 988.6),
+                    (datetime.datetime(2024, 11, 19, 11, 34, 6, 863000), 988.5),
+                ]
+            )
+
+            self.assertEqual(pressure_data, expected_pd)
 
 
 class TestPressureTrendCalculation(unittest.TestCase):
@@ -144,6 +275,79 @@ class TestPressureTrendCalculation(unittest.TestCase):
             truncated_data_points,
         )
 
+    def test_truncating_sorted_data_points_truncates_older_than_three_hours(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=6, minutes=12), 1023.0),
+                (now - datetime.timedelta(hours=3), 1023.0),
+                (now - datetime.timedelta(hours=2, minutes=59), 1023.0),
+                (now - datetime.timedelta(hours=2, minutes=12), 1023.0),
+                (now - datetime.timedelta(hours=1, minutes=19), 1023.0),
+                (now - datetime.timedelta(minutes=20), 1023.0),
+                (now, 1023.0),
+            ]
+        )
+        zambretti = Zambretti()
+        truncated_data_points = (
+            zambretti._truncate_sorted_time_data_to_three_last_hours(
+                pressure_data=pressure_data
+            )
+        )
+
+        expected = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1023.0),
+                (now - datetime.timedelta(hours=2, minutes=12), 1023.0),
+                (now - datetime.timedelta(hours=1, minutes=19), 1023.0),
+                (now - datetime.timedelta(minutes=20), 1023.0),
+                (now, 1023.0),
+            ]
+        )
+
+        self.assertEqual(expected, truncated_data_points)
+
+    def test_sorting_data_points_by_time(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now, 1023.0),
+                (now - datetime.timedelta(hours=1, minutes=19), 1021.0),
+                (now - datetime.timedelta(minutes=20), 1022.0),
+            ]
+        )
+        sorted_pressure_data = pressure_data.sorted_by_time()
+
+        expected = PressureData(
+            [
+                (now - datetime.timedelta(hours=1, minutes=19), 1021.0),
+                (now - datetime.timedelta(minutes=20), 1022.0),
+                (now, 1023.0),
+            ]
+        )
+
+        self.assertEqual(expected, sorted_pressure_data)
+        self.assertTrue(sorted_pressure_data._is_sorted)
+        self.assertIs(sorted_pressure_data.sorted_by_time(), sorted_pressure_data)
+
+    def test_sorted_data_points_cannot_be_modified(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(minutes=20), 1022.0),
+                (now, 1023.0),
+            ]
+        ).sorted_by_time()
+
+        with self.assertRaises(AttributeError):
+            pressure_data.points.append(
+                (now - datetime.timedelta(hours=1, minutes=19), 1021.0)
+            )
+
+    def test_sorted_flag_cannot_be_passed_in(self):
+        with self.assertRaises(TypeError):
+            PressureData([(datetime.datetime.now(), 1023.0)], _is_sorted=True)
+
     def test_filtering_data_points_by_pressure_value(self):
         now = datetime.datetime.now()
         pressure_data = PressureData(
@@ -220,6 +424,33 @@ class TestPressureTrendCalculation(unittest.TestCase):
 
         assert zambretti._get_pressure_difference(pressure_data) == 6
 
+    def test_checking_pressure_difference_within_pressure_range(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1044),
+                (now - datetime.timedelta(hours=2, minutes=49), 1035),
+                (now - datetime.timedelta(hours=2, minutes=39), 1030),
+                (now - datetime.timedelta(hours=2, minutes=29), 1029),
+                (now - datetime.timedelta(hours=2, minutes=12), 1027),
+                (now - datetime.timedelta(hours=1, minutes=59), 1024),
+                (now - datetime.timedelta(hours=1, minutes=19), 1022),
+                (now - datetime.timedelta(minutes=40), 1021),
+                (now - datetime.timedelta(minutes=20), 1052),
+            ]
+        )
+        zambretti = Zambretti()
+        filtered = zambretti._filter_time_data_by_pressure_values(
+            min_value=1000, max_value=1040, pressure_data=pressure_data
+        )
+
+        self.assertEqual(
+            zambretti._get_pressure_difference_within(
+                min_value=1000, max_value=1040, pressure_data=pressure_data
+            ),
+            zambretti._get_pressure_difference(filtered),
+        )
+
     def test_calculating_trend_falling(self):
         now = datetime.datetime.now()
         pressure_data = PressureData(
@@ -274,6 +505,23 @@ class TestPressureTrendCalculation(unittest.TestCase):
 
         self.assertEqual(trend, Trend.RISING)
 
+    def test_calculating_trend_requires_three_readings_in_pressure_range(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 970),
+                (now - datetime.timedelta(hours=2, minutes=49), 971),
+                (now - datetime.timedelta(hours=2, minutes=39), 972),
+                (now - datetime.timedelta(hours=2, minutes=12), 973),
+                (now - datetime.timedelta(hours=1, minutes=19), 986),
+                (now - datetime.timedelta(minutes=20), 987),
+            ]
+        )
+        zambretti = Zambretti()
+
+        with self.assertRaisesRegex(ValueError, "between 985 and 1050"):
+            zambretti.calculate_trend(pressure_data)
+
     def test_forecasting_pressure_falling_quickly(self):
         now = datetime.datetime.now()
         pressure_data = PressureData(
@@ -318,6 +566,60 @@ class TestPressureTrendCalculation(unittest.TestCase):
         )
         self.assertEqual(forecast, "Becoming Fine")
 
+    def test_forecasting_at_given_time(self):
+        now = datetime.datetime(2024, 11, 19, 12, 0)
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1001),
+                (now - datetime.timedelta(hours=2, minutes=49), 1002),
+                (now - datetime.timedelta(hours=2, minutes=39), 1001),
+                (now - datetime.timedelta(hours=2, minutes=12), 1000),
+                (now - datetime.timedelta(hours=1, minutes=19), 1005),
+                (now - datetime.timedelta(minutes=20), 1007),
+            ]
+        )
+        zambretti = Zambretti()
+
+        forecast = zambretti.forecast(
+            elevation=90,
+            temperature=25,
+            pressure_data=pressure_data,
+            wind_direction=WindDirection.NORTH,
+            now=now,
+        )
+        self.assertEqual(forecast, "Becoming Fine")
+
+    def test_forecasting_uses_lookup_table_of_subclass(self):
+        class LocalizedZambretti(Zambretti):
+            PRESSURE_LOOKUP_TABLE = {
+                trend: {
+                    forecast: "LOCAL " + description
+                    for forecast, description in forecasts.items()
+                }
+                for trend, forecasts in Zambretti.PRESSURE_LOOKUP_TABLE.items()
+            }
+
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1001),
+                (now - datetime.timedelta(hours=2, minutes=49), 1002),
+                (now - datetime.timedelta(hours=2, minutes=39), 1001),
+                (now - datetime.timedelta(hours=2, minutes=12), 1000),
+                (now - datetime.timedelta(hours=1, minutes=19), 1005),
+                (now - datetime.timedelta(minutes=20), 1007),
+            ]
+        )
+        zambretti = LocalizedZambretti()
+
+        forecast = zambretti.forecast(
+            elevation=90,
+            temperature=25,
+            pressure_data=pressure_data,
+            wind_direction=WindDirection.NORTH,
+        )
+        self.assertEqual(forecast, "LOCAL Becoming Fine")
+
     def test_forecasting_requires_minimum_six_pressure_readings(self):
         now = datetime.datetime.now()
         pressure_data = PressureData(
@@ -335,3 +637,92 @@ class TestPressureTrendCalculation(unittest.TestCase):
                 pressure_data=pressure_data,
                 wind_direction=WindDirection.NORTH,
             )
+
+    def test_forecasting_batch(self):
+        now = datetime.datetime.now()
+        falling_pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1050.0),
+                (now - datetime.timedelta(hours=2, minutes=49), 1040.0),
+                (now - datetime.timedelta(hours=2, minutes=39), 1030.0),
+                (now - datetime.timedelta(hours=2, minutes=12), 1020.0),
+                (now - datetime.timedelta(hours=1, minutes=19), 1010.0),
+                (now - datetime.timedelta(minutes=20), 1000.0),
+            ]
+        )
+        rising_pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1001),
+                (now - datetime.timedelta(hours=2, minutes=49), 1002),
+                (now - datetime.timedelta(hours=2, minutes=39), 1001),
+                (now - datetime.timedelta(hours=2, minutes=12), 1000),
+                (now - datetime.timedelta(hours=1, minutes=19), 1005),
+                (now - datetime.timedelta(minutes=20), 1007),
+            ]
+        )
+        zambretti = Zambretti()
+
+        forecasts = zambretti.forecast_batch(
+            elevations=[90, 90],
+            temperatures=[25, 25],
+            pressure_datasets=[falling_pressure_data, rising_pressure_data],
+            wind_directions=[WindDirection.NORTH, WindDirection.NORTH],
+        )
+        self.assertEqual(
+            forecasts, ["Showery, Becoming More Unsettled", "Becoming Fine"]
+        )
+
+    def test_forecasting_batch_requires_lists_of_the_same_length(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1001),
+                (now - datetime.timedelta(hours=2, minutes=49), 1002),
+                (now - datetime.timedelta(hours=2, minutes=39), 1001),
+                (now - datetime.timedelta(hours=2, minutes=12), 1000),
+                (now - datetime.timedelta(hours=1, minutes=19), 1005),
+                (now - datetime.timedelta(minutes=20), 1007),
+            ]
+        )
+        zambretti = Zambretti()
+
+        with self.assertRaises(ValueError):
+            zambretti.forecast_batch(
+                elevations=[90, 90],
+                temperatures=[25],
+                pressure_datasets=[pressure_data, pressure_data],
+            )
+
+    def test_forecasting_batch_with_too_few_readings_in_one_dataset(self):
+        now = datetime.datetime.now()
+        pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1001),
+                (now - datetime.timedelta(hours=2, minutes=49), 1002),
+                (now - datetime.timedelta(hours=2, minutes=39), 1001),
+                (now - datetime.timedelta(hours=2, minutes=12), 1000),
+                (now - datetime.timedelta(hours=1, minutes=19), 1005),
+                (now - datetime.timedelta(minutes=20), 1007),
+            ]
+        )
+        short_pressure_data = PressureData(
+            [
+                (now - datetime.timedelta(hours=2, minutes=59), 1001),
+                (now - datetime.timedelta(hours=2, minutes=49), 1002),
+            ]
+        )
+        zambretti = Zambretti()
+
+        forecasts = zambretti.forecast_batch(
+            elevations=[90, 90],
+            temperatures=[25, 25],
+            pressure_datasets=[short_pressure_data, pressure_data],
+            wind_directions=[WindDirection.NORTH, WindDirection.NORTH],
+        )
+        self.assertEqual(
+            forecasts,
+            [
+                "Could not determine the pressure trend from available data",
+                "Becoming Fine",
+            ],
+        )
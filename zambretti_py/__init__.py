@@ -1 +1 @@
-from .zambretti import PressureData, WindDirection, Zambretti  # noqa: F401
+from .zambretti import PressureData, Trend, WindDirection, Zambretti  # noqa: F401
@@ -1,10 +1,62 @@
+import bisect
 import csv
 import datetime
 import math
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-
-from statistics import mean
+from itertools import islice
+from operator import itemgetter
+
+ISO_8601_UTC_TEMPLATE = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+# the Zambretti algorithm only looks at the pressure from the last three hours
+_THREE_HOURS = datetime.timedelta(hours=3)
+
+# exported sensor histories can be large, read them in bigger chunks
+_CSV_READ_BUFFER_SIZE = 1 << 20
+
+
+def _parse_iso8601_z(value: str) -> datetime.datetime:
+    """Parse an ISO-8601 timestamp in the "%Y-%m-%dT%H:%M:%S.%fZ" format.
+
+    This is a fast path for the most common timestamp format, it slices the
+    string directly instead of going through the strptime machinery. Anything
+    not matching the exact shape is handed over to strptime, so the behaviour
+    (including the raised errors) stays the same.
+    """
+    fraction = value[20:-1]
+    if (
+        value[4:5] == "-"
+        and value[7:8] == "-"
+        and value[10:11] == "T"
+        and value[13:14] == ":"
+        and value[16:17] == ":"
+        and value[19:20] == "."
+        and value[-1:] == "Z"
+        and 0 < len(fraction) <= 6
+        and (
+            value[0:4]
+            + value[5:7]
+            + value[8:10]
+            + value[11:13]
+            + value[14:16]
+            + value[17:19]
+            + fraction
+        ).isdigit()
+    ):
+        try:
+            return datetime.datetime(
+                int(value[0:4]),
+                int(value[5:7]),
+                int(value[8:10]),
+                int(value[11:13]),
+                int(value[14:16]),
+                int(value[17:19]),
+                int(fraction + "0" * (6 - len(fraction))),
+            )
+        except ValueError:
+            pass
+    return datetime.datetime.strptime(value, ISO_8601_UTC_TEMPLATE)
 
 
 class Trend(Enum):
@@ -21,12 +73,110 @@ class WindDirection(Enum):
     EAST = 1
 
 
-@dataclass
+# the Zambretti number for each pressure trend is calculated as
+# floor(intercept - slope * pressure)
+_ZAMBRETTI_NUMBER_COEFFICIENTS = {
+    Trend.FALLING: (127, 0.12),
+    Trend.STEADY: (144, 0.13),
+    Trend.RISING: (185, 0.16),
+}
+
+
+def _zambretti_number(
+    trend: Trend, latest_pressure: float, wind_direction: WindDirection | None
+) -> int:
+    """Calculate the Zambretti number used to look up the forecast."""
+    try:
+        intercept, slope = _ZAMBRETTI_NUMBER_COEFFICIENTS[trend]
+    except KeyError:
+        raise ValueError(f"Cannot calculate the Zambretti number for {trend}") from None
+    forecast = math.floor(intercept - slope * latest_pressure)
+
+    if wind_direction:
+        forecast += wind_direction.value
+
+    return forecast
+
+
+def _sea_level_factor(elevation: int, temperature: float) -> float:
+    """Calculate the factor converting the pressure to sea level pressure."""
+    return pow(
+        1 - (0.0065 * elevation) / (temperature + (0.0065 * elevation) + 273.15),
+        -5.257,
+    )
+
+
+# states reported by HomeAssistant when a sensor has no reading
+_HOME_ASSISTANT_EMPTY_STATES = frozenset(("unavailable", "unknown", ""))
+
+
+def _read_home_assistant_csv(
+    fname: str, since: datetime.datetime | None
+) -> list[tuple[datetime.datetime, float]]:
+    """Read the pressure points from a HomeAssistant CSV.
+
+    This is PressureData.from_csv_file specialized for the fixed
+    "entity_id,state,last_changed" schema of HomeAssistant exports. Rows
+    without a reading are recognized by their state and skipped without
+    raising and catching an exception for each of them.
+
+    The exported values are plain, so lines are split on commas directly,
+    only lines with quoted values are handed over to the csv module.
+    """
+    points = []
+    append_point = points.append
+    with open(fname, "r", buffering=_CSV_READ_BUFFER_SIZE, newline="") as csv_file:
+        # skip the header
+        csv_file.__next__()
+        for line in csv_file:
+            if '"' in line:
+                row = next(csv.reader((line,)))
+            else:
+                row = line.rstrip("\r\n").split(",")
+            timestamp = _parse_iso8601_z(row[2])
+            if since is not None and timestamp < since:
+                continue
+            state = row[1]
+            if state in _HOME_ASSISTANT_EMPTY_STATES:
+                continue
+            try:
+                append_point((timestamp, float(state)))
+            except ValueError:
+                continue
+    return points
+
+
+@dataclass(frozen=True, slots=True)
 class PressureData:
-    points: list[tuple[datetime.datetime, float]]
+    points: tuple[tuple[datetime.datetime, float], ...]
+    # set only on points this module sorted, which lets sorting and
+    # truncating skip work, callers cannot pass it for unsorted points
+    _is_sorted: bool = field(default=False, init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        # the points are stored as a tuple, so they cannot change after the
+        # order of them has been checked
+        object.__setattr__(self, "points", tuple(self.points))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.points == other.points
 
     def sorted_by_time(self):
-        return PressureData(points=sorted(self.points, key=lambda x: x[0]))
+        if self._is_sorted:
+            return self
+        return PressureData._from_sorted_points(sorted(self.points, key=itemgetter(0)))
+
+    @classmethod
+    def _from_sorted_points(
+        cls, points: list[tuple[datetime.datetime, float]]
+    ) -> "PressureData":
+        pressure_data = cls(points)
+        object.__setattr__(pressure_data, "_is_sorted", True)
+        return pressure_data
 
     @classmethod
     def from_csv_file(
@@ -36,26 +186,34 @@ class PressureData:
         pressure_column_position: int,
         skip_header_rows: int,
         strptime_template: str,
+        since: datetime.datetime | None = None,
     ) -> "PressureData":
         """Create PressureData object from a CSV file.
 
         This method can be used generate the PressureData object from a
-        CSV file.
+        CSV file. If `since` is given, readings older than it are dropped while
+        reading, so only the relevant part of a long history is kept in memory.
         """
+        if strptime_template == ISO_8601_UTC_TEMPLATE:
+            parse_timestamp = _parse_iso8601_z
+        else:
+
+            def parse_timestamp(value: str) -> datetime.datetime:
+                return datetime.datetime.strptime(value, strptime_template)
+
         clean_pressure_data = []
-        with open(fname, "r") as csv_file:
+        append_point = clean_pressure_data.append
+        with open(fname, "r", buffering=_CSV_READ_BUFFER_SIZE, newline="") as csv_file:
             reader = csv.reader(csv_file)
             # skip the header
             for _ in range(skip_header_rows):
                 reader.__next__()
             for row in reader:
-                timestamp = datetime.datetime.strptime(
-                    row[timestamp_column_position], strptime_template
-                )
+                timestamp = parse_timestamp(row[timestamp_column_position])
+                if since is not None and timestamp < since:
+                    continue
                 try:
-                    clean_pressure_data.append(
-                        (timestamp, float(row[pressure_column_position]))
-                    )
+                    append_point((timestamp, float(row[pressure_column_position])))
                 except Exception:
                     # most probably an empty reading
                     continue
@@ -63,23 +221,22 @@ class PressureData:
         return cls(clean_pressure_data)
 
     @classmethod
-    def from_home_assistant_csv(cls, fname: str) -> "PressureData":
+    def from_home_assistant_csv(
+        cls, fname: str, since: datetime.datetime | None = None
+    ) -> "PressureData":
         """Create PressureData object from a HomeAssistant CSV.
 
         This is a helper method to generate the PressureData object from a
         typical CSV file that can be downloaded from a HomeAssistant sensor
         page.
         """
-        return PressureData.from_csv_file(
-            fname=fname,
-            timestamp_column_position=2,
-            pressure_column_position=1,
-            skip_header_rows=1,
-            strptime_template="%Y-%m-%dT%H:%M:%S.%fZ",
-        )
+        # the exports are in time order, so sorting them is cheap
+        return cls(_read_home_assistant_csv(fname, since)).sorted_by_time()
 
 
 class Zambretti:
+    __slots__ = ()
+
     PRESSURE_LOOKUP_TABLE = {
         Trend.FALLING: {
             1: "Settled Fine",
@@ -122,24 +279,47 @@ class Zambretti:
     }
 
     def _truncate_time_data_to_three_last_hours(
-        self, pressure_data: PressureData
+        self, pressure_data: PressureData, now: datetime.datetime | None = None
     ) -> PressureData:
-        now = datetime.datetime.now()
-        three_hours_ago = now - datetime.timedelta(hours=3)
+        if pressure_data._is_sorted:
+            return self._truncate_sorted_time_data_to_three_last_hours(
+                pressure_data, now
+            )
+
+        if now is None:
+            now = datetime.datetime.now()
+        three_hours_ago = now - _THREE_HOURS
 
         truncated_list = [
             point for point in pressure_data.points if point[0] >= three_hours_ago
         ]
         return PressureData(points=truncated_list)
 
+    def _truncate_sorted_time_data_to_three_last_hours(
+        self, pressure_data: PressureData, now: datetime.datetime | None = None
+    ) -> PressureData:
+        """Truncate the time sorted pressure data to the last three hours.
+
+        As the points are sorted by time, the first point within the last three
+        hours is found with a binary search instead of checking every point.
+        """
+        if now is None:
+            now = datetime.datetime.now()
+        three_hours_ago = now - _THREE_HOURS
+
+        cutoff = bisect.bisect_left(
+            pressure_data.points, three_hours_ago, key=itemgetter(0)
+        )
+        return PressureData._from_sorted_points(pressure_data.points[cutoff:])
+
     def _filter_time_data_by_pressure_values(
         self, min_value: float, max_value: float, pressure_data: PressureData
     ) -> PressureData:
-        filtered_list = []
-
-        for point in pressure_data.points:
-            if min_value <= point[1] <= max_value:
-                filtered_list.append(point)
+        filtered_list = [
+            point
+            for point in pressure_data.points
+            if min_value <= point[1] <= max_value
+        ]
         return PressureData(points=filtered_list)
 
     def _get_pressure_difference(self, pressure_data: PressureData) -> float:
@@ -149,21 +329,55 @@ class Zambretti:
         To better handle momentary pressure spikes, the average of the first and
         last three measurements is used.
         """
-        initial_pressure = mean(
-            [
-                pressure_data.points[0][1],
-                pressure_data.points[1][1],
-                pressure_data.points[2][1],
-            ]
+        initial_pressure = (
+            pressure_data.points[0][1]
+            + pressure_data.points[1][1]
+            + pressure_data.points[2][1]
+        ) / 3
+        final_pressure = (
+            pressure_data.points[-1][1]
+            + pressure_data.points[-2][1]
+            + pressure_data.points[-3][1]
+        ) / 3
+        return round(final_pressure - initial_pressure, 2)
+
+    def _get_pressure_difference_within(
+        self, min_value: float, max_value: float, pressure_data: PressureData
+    ) -> float:
+        """Get the pressure difference for the measurements within a range.
+
+        This gives the same result as getting the pressure difference of the
+        pressure data filtered by the pressure values, but as only the first and
+        last three measurements within the range are used, the points are
+        scanned from both ends until those are found, instead of filtering all
+        of them.
+        """
+        initial_pressures = list(
+            islice(
+                (
+                    pressure
+                    for _, pressure in pressure_data.points
+                    if min_value <= pressure <= max_value
+                ),
+                3,
+            )
         )
-        final_pressure = mean(
-            [
-                pressure_data.points[-1][1],
-                pressure_data.points[-2][1],
-                pressure_data.points[-3][1],
-            ]
+        if len(initial_pressures) < 3:
+            raise ValueError(
+                "Minimum 3 pressure readings between "
+                f"{min_value} and {max_value} are required."
+            )
+        final_pressures = list(
+            islice(
+                (
+                    pressure
+                    for _, pressure in reversed(pressure_data.points)
+                    if min_value <= pressure <= max_value
+                ),
+                3,
+            )
         )
-        return round(final_pressure - initial_pressure, 2)
+        return round(sum(final_pressures) / 3 - sum(initial_pressures) / 3, 2)
 
     def _convert_to_sea_level_pressure(
         self, elevation: int, temperature: float, pressure_data: PressureData
@@ -175,49 +389,40 @@ class Zambretti:
         in the README for a thorough explanation.
 
         """
-        converted_to_sea_level_pressure = []
-        sea_level_pressure_calculation = pow(
-            1 - (0.0065 * elevation) / (temperature + (0.0065 * elevation) + 273.15),
-            -5.257,
-        )
-        for point in pressure_data.points:
-            converted_to_sea_level_pressure.append(
-                (point[0], round(point[1] * sea_level_pressure_calculation, 2))
-            )
+        sea_level_pressure_calculation = _sea_level_factor(elevation, temperature)
+        converted_to_sea_level_pressure = [
+            (timestamp, round(pressure * sea_level_pressure_calculation, 2))
+            for timestamp, pressure in pressure_data.points
+        ]
+        if pressure_data._is_sorted:
+            return PressureData._from_sorted_points(converted_to_sea_level_pressure)
         return PressureData(points=converted_to_sea_level_pressure)
 
-    def calculate_trend(self, pressure_data: PressureData) -> Trend:
+    def calculate_trend(
+        self, pressure_data: PressureData, now: datetime.datetime | None = None
+    ) -> Trend:
         """Calculate the trend for the atmospheric pressure.
 
         This method calculates whether the pressure in the last three hours has
-        been rising, falling, or has been steady.
+        been rising, falling, or has been steady. The three hours are counted
+        back from `now`, which defaults to the current time.
         """
-        pressure_data = self._truncate_time_data_to_three_last_hours(pressure_data)
+        # truncating first leaves only a few points to sort, data already
+        # sorted by time is truncated with a binary search
+        pressure_data = self._truncate_time_data_to_three_last_hours(
+            pressure_data, now
+        ).sorted_by_time()
 
         if len(pressure_data.points) < 6:
             raise ValueError("Minimum 6 pressure readings are required.")
 
-        pressure_data = pressure_data.sorted_by_time()
-
         # the min and max values provided below are constants coming from the
         # definition of the Zambretti algorithm
-        filtered_for_falling = self._filter_time_data_by_pressure_values(
-            min_value=985, max_value=1050, pressure_data=pressure_data
-        )
-        filtered_for_steady = self._filter_time_data_by_pressure_values(
-            min_value=960, max_value=1033, pressure_data=pressure_data
-        )
-        filtered_for_rising = self._filter_time_data_by_pressure_values(
-            min_value=947, max_value=1030, pressure_data=pressure_data
-        )
-        if self._get_pressure_difference(filtered_for_falling) < -1.6:
+        if self._get_pressure_difference_within(985, 1050, pressure_data) < -1.6:
             return Trend.FALLING
-        if self._get_pressure_difference(filtered_for_rising) > 1.6:
+        if self._get_pressure_difference_within(947, 1030, pressure_data) > 1.6:
             return Trend.RISING
-        if (
-            self._get_pressure_difference(filtered_for_steady) > -1.6
-            and self._get_pressure_difference(filtered_for_steady) < 1.6
-        ):
+        if -1.6 < self._get_pressure_difference_within(960, 1033, pressure_data) < 1.6:
             return Trend.STEADY
         return Trend.UNKNOWN
 
@@ -227,28 +432,59 @@ class Zambretti:
         temperature: float,
         pressure_data: PressureData,
         wind_direction: WindDirection | None = None,
+        now: datetime.datetime | None = None,
     ) -> str:
-        forecast = 0
         pressure_data = self._convert_to_sea_level_pressure(
             elevation, temperature, pressure_data
         )
 
-        trend = self.calculate_trend(pressure_data)
-
-        latest_pressure = pressure_data.points[-1][1]
-        match trend:
-            case trend.UNKNOWN:
-                return "Could not determine the pressure trend from available data"
-            case Trend.FALLING:
-                forecast = math.floor(127 - 0.12 * latest_pressure)
-            case Trend.STEADY:
-                forecast = math.floor(144 - 0.13 * latest_pressure)
-            case Trend.RISING:
-                forecast = math.floor(185 - 0.16 * latest_pressure)
-
-        if wind_direction:
-            forecast += wind_direction.value
+        trend = self.calculate_trend(pressure_data, now)
+        if trend == Trend.UNKNOWN:
+            return "Could not determine the pressure trend from available data"
 
+        forecast = _zambretti_number(trend, pressure_data.points[-1][1], wind_direction)
         return self.PRESSURE_LOOKUP_TABLE[trend].get(
             forecast, "Could not forecast the weather from available data"
         )
+
+    def forecast_batch(
+        self,
+        elevations: list[int],
+        temperatures: list[float],
+        pressure_datasets: list[PressureData],
+        wind_directions: list[WindDirection | None] | None = None,
+        now: datetime.datetime | None = None,
+    ) -> list[str]:
+        """Forecast the weather for many sets of measurements at once.
+
+        The arguments are parallel lists, one entry for each forecast, lists of
+        different lengths raise a ValueError. All the forecasts are made for the
+        same point in time, the current time is read only once if `now` is not
+        given. An entry without enough pressure readings to calculate the trend
+        does not stop the others, its forecast is a "Could not determine..."
+        description instead.
+        """
+        if wind_directions is None:
+            wind_directions = [None] * len(pressure_datasets)
+        if not (
+            len(elevations)
+            == len(temperatures)
+            == len(pressure_datasets)
+            == len(wind_directions)
+        ):
+            raise ValueError("All the lists must have the same length.")
+        if now is None:
+            now = datetime.datetime.now()
+
+        forecasts = []
+        for elevation, temperature, pressure_data, wind_direction in zip(
+            elevations, temperatures, pressure_datasets, wind_directions
+        ):
+            try:
+                forecast = self.forecast(
+                    elevation, temperature, pressure_data, wind_direction, now
+                )
+            except ValueError:
+                forecast = "Could not determine the pressure trend from available data"
+            forecasts.append(forecast)
+        return forecasts